@@ -0,0 +1,74 @@
+"""
+Benchmark of the parallel extraction of the student archives.
+
+Builds N synthetic handin archives in a temporary folder, each with a few Python files and some
+incompressible data, and times `extract_archives' with 1, 4 and 8 workers, both with threads and
+with processes (`--processes'). Every run extracts into a fresh folder.
+The speedup depends on the number of CPUs; on a single CPU more workers only add overhead.
+
+    python benchmarks/bench_extract.py [--handins N] [--files N]
+"""
+
+__author__ = "Lukas Horst"
+
+import argparse
+import contextlib
+import io
+import os
+import pathlib
+import sys
+import tempfile
+import time
+import zipfile
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent.absolute()))
+
+import eprgrader  # noqa: E402
+
+
+def build_archives(folder: pathlib.Path, handins: int, files: int):
+    """Create one archive per handin and return their paths"""
+    archives = []
+    for i in range(handins):
+        handin = folder / f'Student {i}_{i}_assignsubmission_file'
+        handin.mkdir(parents=True)
+        archive = handin / 'blatt0.zip'
+        with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as zip_obj:
+            for k in range(files):
+                zip_obj.writestr(f'blatt0/aufgabe{k}.py', f'x = {k}\n' * 20000)
+            zip_obj.writestr('blatt0/daten.bin', os.urandom(1 << 18))
+        archives.append(archive)
+    return archives
+
+
+def main():
+    """The function main is where execution begins."""
+    parser = argparse.ArgumentParser(description="Time the extraction with several workers.")
+    parser.add_argument('--handins', type=int, default=100,
+                        help='number of handin archives (default: 100)')
+    parser.add_argument('--files', type=int, default=10,
+                        help='number of Python files per archive (default: 10)')
+    args = parser.parse_args()
+    print(f"CPUs: {os.cpu_count()}")
+    with tempfile.TemporaryDirectory() as tmp:
+        archives = build_archives(pathlib.Path(tmp) / 'abgaben', args.handins, args.files)
+        print(f"{'pool':>9} {'jobs':>5} {'time (s)':>9} {'speedup':>8}")
+        for processes in (False, True):
+            single = None
+            for workers in (1, 4, 8):
+                target = pathlib.Path(tmp) / f'out-{processes}-{workers}'
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    failed = eprgrader.extract_archives(
+                        archives, [target / file.parent.name for file in archives], workers,
+                        processes)
+                duration = time.perf_counter() - start
+                if failed:
+                    raise RuntimeError(f"{len(failed)} archives could not be extracted")
+                single = single or duration
+                print(f"{'processes' if processes else 'threads':>9} {workers:>5} "
+                      f"{duration:>9.2f} {single / duration:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark of the file index on a sheet whose handins bundle virtualenvs.
+
+Builds a synthetic sheet in a temporary folder, where every third handin contains a `.venv', a
+virtualenv with another name and a `.git' tree. It then times the recursive globs the grading
+phases used before against a single `FileIndex' walk and the queries on it.
+
+    python benchmarks/bench_file_index.py [--handins N] [--venv-files N]
+"""
+
+__author__ = "Lukas Horst"
+
+import argparse
+import itertools
+import pathlib
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent.absolute()))
+
+from file_index import FileIndex  # noqa: E402
+
+
+def build_sheet(sheet: pathlib.Path, handins: int, venv_files: int):
+    """Create two tutorials with the given number of handins each"""
+    for tutorial in ('EPR01', 'EPR02'):
+        (sheet / tutorial / f'{tutorial}.zip').parent.mkdir(parents=True)
+        (sheet / tutorial / f'{tutorial}.zip').touch()
+        for i in range(handins):
+            handin = sheet / tutorial / 'abgaben' / f'Student {i}_{i}_assignsubmission_file'
+            project = handin / 'blatt0'
+            project.mkdir(parents=True)
+            (handin / 'blatt0.zip').touch()
+            (project / 'main.py').write_text('x = 1\n')
+            (project / 'helper.py').write_text('y = 2\n')
+            if i % 3:
+                continue
+            for venv in ('.venv', 'myenv'):
+                (project / venv).mkdir()
+                (project / venv / 'pyvenv.cfg').touch()
+                for k in range(venv_files):
+                    package = project / venv / 'lib' / 'site-packages' / f'package{k // 10}'
+                    package.mkdir(parents=True, exist_ok=True)
+                    (package / f'module{k}.py').touch()
+            for k in range(venv_files // 2):
+                (project / '.git' / 'objects' / f'{k:02x}').mkdir(parents=True, exist_ok=True)
+
+
+def with_globs(sheet: pathlib.Path):
+    """Find the files of all phases like the grading phases did before the index"""
+    downloads = list(sheet.glob('**/*.zip'))
+    archives = list(sheet.glob('**/abgaben/**/*.zip'))
+    handins = [f for f in itertools.chain.from_iterable(
+        (group.iterdir() for group in sheet.glob('**/abgaben'))) if f.is_dir()]
+    pythons = [p for folder in handins for p in folder.glob('**/*.py')
+               if '__MACOSX' not in p.parts and '.venv' not in p.parts]
+    return len(downloads), len(archives), len(handins), len(pythons)
+
+
+def with_index(sheet: pathlib.Path):
+    """Find the files of all phases with a single walk of the file index"""
+    index = FileIndex(sheet)
+    downloads = index.files('zip')
+    archives = list(dict.fromkeys(itertools.chain.from_iterable(
+        index.files('zip', group) for group in index.dirs('abgaben'))))
+    handins = index.handins()
+    pythons = [p for folder in handins for p in index.files('py', folder)]
+    return len(downloads), len(archives), len(handins), len(pythons)
+
+
+def main():
+    """The function main is where execution begins."""
+    parser = argparse.ArgumentParser(description="Compare the file index to recursive globs.")
+    parser.add_argument('--handins', type=int, default=50,
+                        help='number of handins per tutorial (default: 50)')
+    parser.add_argument('--venv-files', type=int, default=300,
+                        help='number of modules in each bundled virtualenv (default: 300)')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='number of timed runs, the best one is reported (default: 5)')
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        sheet = pathlib.Path(tmp) / 'blatt0'
+        build_sheet(sheet, args.handins, args.venv_files)
+        print(f"{'method':>8} {'best (s)':>9} {'downloads':>10} {'archives':>9} {'handins':>8} "
+              f"{'pythons':>8}")
+        for function in (with_globs, with_index):
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                counts = function(sheet)
+                timings.append(time.perf_counter() - start)
+            print(f"{function.__name__[5:]:>8} {min(timings):>9.4f} {counts[0]:>10} "
+                  f"{counts[1]:>9} {counts[2]:>8} {counts[3]:>8}")
+
+
+if __name__ == "__main__":
+    main()
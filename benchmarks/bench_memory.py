@@ -0,0 +1,143 @@
+"""
+Memory benchmark for the style check results.
+
+Feeds synthetic pylint/pycodestyle output for N, 10N and 100N submissions through
+`write_stylecheck' (filtering, counting and the kept deduction summaries) and, for comparison,
+through the former in-memory way which kept a full ViolationChecker and the filtered output of
+every student. It reports the peak heap and how much the peak RSS grew during each run (imports
+excluded). Every run happens in a fresh process, so the numbers are comparable.
+
+Neither mode is completely flat: the streaming mode keeps a deduction summary of about 330 bytes
+per student, so its peak still grows linearly, but by roughly 1 KiB per student against about
+40 KiB per student for the baseline with the default of five files per submission.
+
+    python benchmarks/bench_memory.py [--submissions N] [--files N]
+"""
+
+__author__ = "Lukas Horst"
+
+import argparse
+import io
+import pathlib
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent.absolute()))
+
+import eprgrader  # noqa: E402
+from violation_checker import ViolationChecker  # noqa: E402
+
+# The kept results of the baseline mode, like the former module-global violations_checkers
+baseline_checkers = {}
+
+LINT_OUTPUT = '''************* Module main
+main.py:1:0: C0114: Missing module docstring (missing-module-docstring)
+main.py:{n}:0: C0103: Variable name "x" doesn't conform to snake_case naming style (invalid-name)
+main.py:{n}:4: C0116: Missing function or method docstring (missing-function-docstring)
+main.py:{n}:0: W0603: Using the global statement (global-statement)
+
+
+main.py:{n}:80: E501 line too long (85 > 79 characters)
+    print("a rather long line which is still short enough for the relaxed limit of 99")
+                                                                               ^
+main.py:{n}:80: E501 line too long (120 > 79 characters)
+    print("a line which is really too long, even for the relaxed limit of ninety-nine chars...")
+                                                                               ^
+main.py:{n}:10: E231 missing whitespace after ':'
+    x = {{1:2}}
+          ^
+main.py:{n}:5: E225 missing whitespace around operator
+    y=1
+     ^
+
+
+'''
+
+
+def lint_submission(lintcache, files: int):
+    """Write the synthetic linter output of one submission with the given number of files"""
+    for n in range(files * 10):
+        lintcache.write(LINT_OUTPUT.format(n=n))
+
+
+def write_stylecheck_baseline(lintcache, folder: pathlib.Path, deduction: bool,
+                             docstring_deduction: bool):
+    """
+    The style check results as they were written before streaming: the whole linter output in a
+    StringIO, copied while filtering, and the full ViolationChecker kept per student together
+    with the filtered output it was built from
+    """
+    cache = io.StringIO(lintcache.read())
+    style_check = "\n".join(eprgrader.remove_unnecessary_violations(
+        io.StringIO(cache.getvalue())))
+    violation_checker = ViolationChecker(deduction, docstring_deduction)
+    for line in style_check.splitlines():
+        violation_checker.check_line(line)
+    if violation_checker.count_violations(-1) == 0:
+        style_check = "Alles sieht gut aus -- weiter so!\n"
+    baseline_checkers.update({folder.name.split('_')[0]: (violation_checker, style_check)})
+    with open(folder / 'stylecheck.txt', 'w', encoding='utf-8') as outfile:
+        outfile.write(f'{style_check}\n{violation_checker.list_violation()}')
+
+
+def peak_rss():
+    """Return the peak RSS of this process in KiB, or 0 where it cannot be measured"""
+    if resource is None:
+        return 0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == 'darwin' else rss
+
+
+def run(submissions: int, files: int, baseline: bool):
+    """
+    Run the style check results of a whole cohort and return the peak heap and the growth of the
+    peak RSS during the run in KiB
+    """
+    write = write_stylecheck_baseline if baseline else eprgrader.write_stylecheck
+    rss_before = peak_rss()
+    tracemalloc.start()
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(submissions):
+            folder = pathlib.Path(tmp) / f'Student {i}_{i}_assignsubmission_file'
+            folder.mkdir()
+            with tempfile.TemporaryFile('w+', encoding='utf-8') as lintcache:
+                lint_submission(lintcache, files)
+                lintcache.seek(0)
+                write(lintcache, folder, True, True)
+    traced_peak = tracemalloc.get_traced_memory()[1] // 1024
+    tracemalloc.stop()
+    return traced_peak, peak_rss() - rss_before
+
+
+def main():
+    """The function main is where execution begins."""
+    parser = argparse.ArgumentParser(description="Measure the peak memory of the style check.")
+    parser.add_argument('--submissions', type=int, default=20,
+                        help='the smallest cohort size N, also runs 10N and 100N (default: 20)')
+    parser.add_argument('--files', type=int, default=5,
+                        help='number of Python files per submission (default: 5)')
+    parser.add_argument('--single', choices=('streaming', 'baseline'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.single:
+        traced_peak, rss_growth = run(args.submissions, args.files, args.single == 'baseline')
+        print(f'{traced_peak} {rss_growth}')
+        return
+    print(f"{'mode':>10} {'submissions':>12} {'peak heap (KiB)':>16} {'RSS growth (KiB)':>17}")
+    for mode in ('baseline', 'streaming'):
+        for submissions in (args.submissions, args.submissions * 10, args.submissions * 100):
+            result = subprocess.run([sys.executable, __file__, '--single', mode,
+                                     '--submissions', str(submissions), '--files', str(args.files)],
+                                    check=True, capture_output=True, text=True)
+            traced_peak, rss_growth = result.stdout.split()
+            print(f'{mode:>10} {submissions:>12} {traced_peak:>16} {rss_growth:>17}')
+
+
+if __name__ == "__main__":
+    main()
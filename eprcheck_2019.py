@@ -1,10 +1,104 @@
 __author__ = "Adrian Welcker"
 
+import argparse
+import ast
+import collections
+import pathlib
 import re
-import astroid
+import sys
+
+from astroid import nodes
 from pylint.checkers import BaseChecker
 from pylint.interfaces import IAstroidChecker
 
+from file_index import FileIndex
+
+SINGLE_PATTERN = re.compile(r'^[0-9]{7}, ?.+')
+PAIRS_PATTERN = re.compile(r'^[0-9]{7}, ?.+?, ?[0-9]{7}, ?.+')
+
+# Returned by the target lookups when a target does not assign __author__ at all
+_NOT_AUTHOR = object()
+
+# Compound statements whose bodies still belong to the module scope (function and class
+# definitions do not), and the fields holding those bodies
+BLOCK_NAMES = ('If', 'For', 'While', 'With', 'Try', 'TryStar', 'TryExcept', 'TryFinally',
+               'ExceptHandler')
+BLOCK_FIELDS = ('body', 'handlers', 'orelse', 'finalbody')
+
+# The node classes of a syntax tree, so the same lookup works for astroid and the ast module
+TreeClasses = collections.namedtuple('TreeClasses', (
+    'assign', 'ann_assign', 'aug_assign', 'name', 'name_attribute', 'sequence', 'starred',
+    'const', 'blocks'))
+ASTROID_CLASSES = TreeClasses(nodes.Assign, nodes.AnnAssign, nodes.AugAssign, nodes.AssignName,
+                              'name', (nodes.Tuple, nodes.List), nodes.Starred, nodes.Const,
+                              tuple(getattr(nodes, name) for name in BLOCK_NAMES
+                                    if hasattr(nodes, name)))
+AST_CLASSES = TreeClasses(ast.Assign, ast.AnnAssign, ast.AugAssign, ast.Name, 'id',
+                          (ast.Tuple, ast.List), ast.Starred, ast.Constant,
+                          tuple(getattr(ast, name) for name in BLOCK_NAMES if hasattr(ast, name)))
+
+
+def _target_value(target, value, classes: TreeClasses):
+    """Return the value assigned to __author__ by the given target, None if it is assigned from
+    something that cannot be resolved statically."""
+    if isinstance(target, classes.name):
+        return value if getattr(target, classes.name_attribute) == '__author__' else _NOT_AUTHOR
+    if isinstance(target, classes.sequence):
+        unpacked = (isinstance(value, classes.sequence)
+                    and len(value.elts) == len(target.elts))
+        for i, element in enumerate(target.elts):
+            found = _target_value(element, value.elts[i] if unpacked else None, classes)
+            if found is not _NOT_AUTHOR:
+                return found
+    if isinstance(target, classes.starred):
+        found = _target_value(target.value, None, classes)
+        if found is not _NOT_AUTHOR:
+            return found
+    return _NOT_AUTHOR
+
+
+def _find_author(body, classes: TreeClasses):
+    """Return the first module-level statement assigning __author__ and the assigned value
+    (None if the value is not a plain expression), or (None, _NOT_AUTHOR).
+    Descends into if/for/while/with/try blocks, but not into functions or classes."""
+    for statement in body:
+        if isinstance(statement, classes.blocks):
+            for field in BLOCK_FIELDS:
+                found, value = _find_author(getattr(statement, field, None) or (), classes)
+                if found is not None:
+                    return found, value
+        elif isinstance(statement, classes.assign):
+            for target in statement.targets:
+                value = _target_value(target, statement.value, classes)
+                if value is not _NOT_AUTHOR:
+                    return statement, value
+        elif isinstance(statement, (classes.ann_assign, classes.aug_assign)):
+            value = statement.value if isinstance(statement, classes.ann_assign) else None
+            if _target_value(statement.target, value, classes) is not _NOT_AUTHOR:
+                return statement, value
+    return None, _NOT_AUTHOR
+
+
+def _author_message(value, const_class, pattern):
+    """Return the symbol of the message for the assigned __author__ value, or None if it is fine."""
+    if value is _NOT_AUTHOR:
+        return 'missing-author-variable'
+    if not isinstance(value, const_class) or not isinstance(value.value, str):
+        return 'incorrectly-assigned-author-variable'
+    if not pattern.fullmatch(value.value):
+        return 'malformed-author-variable'
+    return None
+
+
+def _message_node(module, statement, value):
+    """Return the node a message should be attached to: the value, else the statement, else the
+    module."""
+    if value is not None and value is not _NOT_AUTHOR:
+        return value
+    if statement is not None:
+        return statement
+    return module
+
 
 class EPRAuthorVariableChecker(BaseChecker):
     __implements__ = IAstroidChecker
@@ -39,33 +133,65 @@ class EPRAuthorVariableChecker(BaseChecker):
 
     def __init__(self, linter):
         super(EPRAuthorVariableChecker, self).__init__(linter)
-        self._found_author = False
-
-    def visit_assign(self, node):
-        if self._found_author:
-            return
-        if isinstance(node.targets[0], astroid.Subscript):
-            return
-        if node.targets[0].name != '__author__':
-            return
-
-        self._found_author = True
-        if isinstance(node.value, astroid.node_classes.Const) \
-                and node.value.pytype() == 'builtins.str':
-            if self.linter.config.use_pairs:
-                exp = re.compile(r'^[0-9]{7}, ?.+?, ?[0-9]{7}, ?.+')
-            else:
-                exp = re.compile(r'^[0-9]{7}, ?.+')
-            if not exp.fullmatch(node.value.value):
-                self.add_message('malformed-author-variable', node=node.value)
-        else:
-            self.add_message('incorrectly-assigned-author-variable', node=node.value)
-
-    def leave_module(self, node):
-        if not self._found_author:
-            self.add_message('missing-author-variable', node=node)
-        self._found_author = False
+        self._pattern = SINGLE_PATTERN
+
+    def open(self):
+        self._pattern = PAIRS_PATTERN if self.linter.config.use_pairs else SINGLE_PATTERN
+
+    def visit_module(self, node):
+        # Only module-scope statements are inspected, so the whole decision is made here and
+        # the checker has nothing to do for the rest of the tree
+        statement, value = _find_author(node.body, ASTROID_CLASSES)
+        message = _author_message(value, ASTROID_CLASSES.const, self._pattern)
+        if message is not None:
+            self.add_message(message, node=_message_node(node, statement, value))
 
 
 def register(linter):
     linter.register_checker(EPRAuthorVariableChecker(linter))
+
+
+def check_author_file(path, use_pairs: bool):
+    """
+    Check the __author__ variable of a single file without running pylint.
+    Returns a tuple (line, symbol), or None if the variable is fine.
+    """
+    with open(path, 'rb') as file:
+        try:
+            module = ast.parse(file.read(), filename=str(path))
+        except SyntaxError as e:
+            return e.lineno or 1, 'syntax-error'
+        except ValueError:
+            # Source containing null bytes
+            return 1, 'syntax-error'
+    statement, value = _find_author(module.body, AST_CLASSES)
+    message = _author_message(value, AST_CLASSES.const,
+                              PAIRS_PATTERN if use_pairs else SINGLE_PATTERN)
+    if message is None:
+        return None
+    node = _message_node(None, statement, value)
+    return (node.lineno if node is not None else 1), message
+
+
+def main():
+    """Check the __author__ variables of all Python files in the given folders."""
+    parser = argparse.ArgumentParser(description="Check the __author__ variable of EPR modules.")
+    parser.add_argument('folders', nargs='*', default=['.'],
+                        help='the folders to check (default: the current folder)')
+    parser.add_argument('--pairs', action=argparse.BooleanOptionalAction, default=False,
+                        help='whether or not to validate __author__ variables for pairs')
+    args = parser.parse_args()
+    issues = 0
+    for folder in args.folders:
+        for path in sorted(FileIndex(pathlib.Path(folder)).files('py')):
+            result = check_author_file(path, args.pairs)
+            if result is not None:
+                issues += 1
+                print(f"{path}:{result[0]}: {result[1]}")
+    print(f"{issues} issue(s) found.", file=sys.stderr)
+    if issues:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
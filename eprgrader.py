@@ -12,16 +12,17 @@ __author__ = "Adrian Welcker"
 __credits__ = "Adjustments from Lukas Horst"
 
 import argparse
+import concurrent.futures
 import contextlib
 import copy
 import csv
-import io
 import itertools
 import os
 import pathlib
 import platform
 import shutil
 import sys
+import tempfile
 
 import openpyxl
 import pandas as pd
@@ -35,7 +36,8 @@ from datetime import datetime
 from pylint.lint import Run as RunPylint
 import pycodestyle
 
-from violation_checker import ViolationChecker
+from file_index import FileIndex
+from violation_checker import DeductionSummary, ViolationChecker
 
 PYLINT_ARGS = [
     '--exit-zero',  # always exit with code 0, even when problems are found
@@ -127,7 +129,7 @@ PYCODESTYLE_SELECT = [
     'E721',
 ]
 tmp_storage = {}
-violations_checkers = {}
+deduction_summaries = {}
 
 
 @contextlib.contextmanager
@@ -146,7 +148,8 @@ def pylint_context(stdout, workdir):
     sys.stdout = sys.__stdout__
 
 
-def lint_files(folders, author_pairs, deduction: bool, docstring_deduction: bool):
+def lint_files(folders, index: FileIndex, author_pairs, deduction: bool,
+               docstring_deduction: bool):
     """Run pylint and pycodestyle on all Python files anywhere within `folders'."""
     count = 0
     total = len(folders)
@@ -155,78 +158,84 @@ def lint_files(folders, author_pairs, deduction: bool, docstring_deduction: bool
     for folder in folders:
         count += 1
         print(f" ({str(count).rjust(len(str(total)))}/{total}) Checking {folder.name}")
-        pythons = list(map(pathlib.Path.resolve,
-                           filter(lambda p: "__MACOSX" not in p.parts and ".venv" not in p.parts,
-                                  folder.glob('**/*.py'))))
+        pythons = list(map(pathlib.Path.resolve, index.files('py', folder)))
         if not pythons:
             continue
         pycount = 0
         pytotal = len(pythons) * 2
-        lintcache = io.StringIO()
-        for file in pythons:
-            pycount += 1
-            print(
-                f"  ({str(pycount).rjust(len(str(pytotal)))}/{pytotal}) Running pylint for {file.name}")
-            with pylint_context(lintcache, folder):
-                try:
-                    RunPylint(PYLINT_ARGS + [str(file)])
-                except SystemExit as e:
-                    if e.code:
-                        print(f"  [Pylint attempted to exit with code {e.code}]", file=sys.stderr)
-                        raise RuntimeError from e
+        # The linter output is streamed to a temporary file on disk instead of being kept in memory
+        with tempfile.TemporaryFile('w+', encoding='utf-8') as lintcache:
+            for file in pythons:
                 pycount += 1
                 print(
-                    f"  ({str(pycount).rjust(len(str(pytotal)))}/{pytotal}) Running pycodestyle for {file.name}",
-                    file=sys.__stdout__)
-                print('\n')
-                result = style.check_files([file])
-                if result.total_errors > 0:
+                    f"  ({str(pycount).rjust(len(str(pytotal)))}/{pytotal}) Running pylint for {file.name}")
+                with pylint_context(lintcache, folder):
+                    try:
+                        RunPylint(PYLINT_ARGS + [str(file)])
+                    except SystemExit as e:
+                        if e.code:
+                            print(f"  [Pylint attempted to exit with code {e.code}]",
+                                  file=sys.stderr)
+                            raise RuntimeError from e
+                    pycount += 1
+                    print(
+                        f"  ({str(pycount).rjust(len(str(pytotal)))}/{pytotal}) Running pycodestyle for {file.name}",
+                        file=sys.__stdout__)
                     print('\n')
-        with open(folder / 'stylecheck.txt', 'w', encoding='utf-8') as outfile:
-            if lintcache.tell() > 0:
-                style_check = remove_unnecessary_violations(lintcache.getvalue())
-            else:
-                style_check = ""
-            violation_checker = ViolationChecker(style_check, deduction, docstring_deduction)
-            violation_checker.check_violations()
-            if violation_checker.count_violations(-1) == 0:
-                style_check = "Alles sieht gut aus -- weiter so!\n"
-            violation_string = violation_checker.list_violation()
-            violations_checkers.update({folder.name.split('_')[0]: violation_checker})
-            style_check += f'\n{violation_string}'
-            outfile.write(style_check)
-
-
-def remove_unnecessary_violations(style_check: str):
+                    result = style.check_files([file])
+                    if result.total_errors > 0:
+                        print('\n')
+            lintcache.seek(0)
+            write_stylecheck(lintcache, folder, deduction, docstring_deduction)
+
+
+def write_stylecheck(lintcache, folder: pathlib.Path, deduction: bool, docstring_deduction: bool):
+    """
+    Filter the linter output line by line into the stylecheck.txt of `folder' and keep the
+    deduction summary of the student
     """
-    Function to delete all lines with a violation to ignore
+    with open(folder / 'stylecheck.txt', 'w', encoding='utf-8') as outfile:
+        violation_checker = ViolationChecker(deduction, docstring_deduction)
+        separator = ''
+        for line in remove_unnecessary_violations(lintcache):
+            violation_checker.check_line(line)
+            outfile.write(f'{separator}{line}')
+            separator = '\n'
+        if violation_checker.count_violations(-1) == 0:
+            outfile.seek(0)
+            outfile.truncate()
+            outfile.write("Alles sieht gut aus -- weiter so!\n")
+        deduction_summaries.update({folder.name.split('_')[0]: violation_checker.summary()})
+        outfile.write(f'\n{violation_checker.list_violation()}')
+
+
+def remove_unnecessary_violations(style_check):
+    """
+    Generator to skip all lines with a violation to ignore, reading the given lines one by one
     author: Lukas Horst
     """
-    lines = style_check.splitlines()
-
-    filtered_lines = []
+    lines = (line.rstrip('\n') for line in style_check)
+    line = next(lines, None)
 
     skip_count = 0
 
     e501_pattern = re.compile(r"E501 line too long \((\d+) > 79 characters\)")
     e231_pattern = re.compile(r"f['\"].*\{.*?:.+?}.*['\"]")
 
-    for i, line in enumerate(lines):
+    while line is not None:
+        next_line = next(lines, None)
         if skip_count > 0:
             skip_count -= 1
-            continue
         # Removing lines violations which are shorter than 100
-        match = e501_pattern.search(line)
-        if match:
+        elif match := e501_pattern.search(line):
             line_length = int(match.group(1))
             if line_length <= 99:
                 skip_count = 2
-                continue
             else:
-                line = line.replace('79', '99')
+                yield line.replace('79', '99')
         # Upper case violations
         elif "C0103" in line and "doesn't conform to UPPER_CASE naming style" in line:
-            continue
+            pass
         # Allowing variable, argument and attribute names with only one char
         elif ("C0103" in line and "doesn't conform to snake_case naming style" in line
               and ('Argument name "' in line or 'Variable name "' in line
@@ -234,19 +243,19 @@ def remove_unnecessary_violations(style_check: str):
             start_index = line.find('"') + 1
             end_index = line.find('"', start_index)
             argument_name = line[start_index:end_index]
-            if len(argument_name) == 1:
-                continue
+            if len(argument_name) != 1:
+                yield line
         # Allowing all module names
         elif "C0103" in line and "Module name" in line:
-            continue
+            pass
         # Ignoring a missing whitespace after : in a print command or in a curly bracket of an f-
         # string
-        elif "E231" in line and "after ':'" in line and ("print(" in lines[i + 1] or
-                                                         e231_pattern.search(lines[i + 1])):
+        elif ("E231" in line and "after ':'" in line and next_line is not None
+              and ("print(" in next_line or e231_pattern.search(next_line))):
             skip_count = 2
-            continue
-        filtered_lines.append(line)
-    return "\n".join(filtered_lines)
+        else:
+            yield line
+        line = next_line
 
 
 def fix_path(path: str) -> str:
@@ -265,34 +274,76 @@ def safe_extract_zip(zip_obj: zipfile.ZipFile, parent: pathlib.Path):
                 fout.write(fin.read())
 
 
+def extract_archives_into(archives, parent: pathlib.Path):
+    """
+    Extract the given archives one after another into the same folder, returning the archives
+    which could not be extracted together with the error
+    """
+    failed = []
+    for file in archives:
+        try:
+            with zipfile.ZipFile(file, 'r') as zip_obj:
+                # zip_obj.extractall(parent)
+                safe_extract_zip(zip_obj, parent)
+        except Exception as e:
+            # A broken upload must not stop the extraction of all the others
+            failed.append((file, str(e)))
+    return failed
+
+
+def extract_archives(archives, targets, workers: int, processes: bool):
+    """
+    Extract every archive into its target folder using a pool of workers, returning the archives
+    which could not be extracted.
+    Archives sharing a target folder are extracted in a single task in a fixed order, so
+    overlapping files always end up the same way.
+    """
+    groups = {}
+    for file, target in sorted(zip(archives, targets)):
+        groups.setdefault(target, []).append(file)
+    executor_class = (concurrent.futures.ProcessPoolExecutor if processes
+                      else concurrent.futures.ThreadPoolExecutor)
+    failed = []
+    count = 0
+    total = len(archives)
+    with executor_class(max_workers=workers) as executor:
+        futures = {executor.submit(extract_archives_into, files, target): files
+                   for target, files in groups.items()}
+        for future in concurrent.futures.as_completed(futures):
+            errors = dict(future.result())
+            for file in futures[future]:
+                count += 1
+                if file in errors:
+                    print(f" ({str(count).rjust(len(str(total)))}/{total}) ! Failed to extract "
+                          f"{file.name}: {errors[file]}")
+                    failed.append(file)
+                else:
+                    print(f" ({str(count).rjust(len(str(total)))}/{total}) Extracted {file.name}")
+    return failed
+
+
 def begin_grading(folder: pathlib.Path, ratings_file: pathlib.Path, check_style: bool,
-                  author_pairs: bool, deduction: bool, docstring_deduction: bool):
+                  author_pairs: bool, deduction: bool, docstring_deduction: bool, workers: int,
+                  processes: bool):
+    index = FileIndex(folder)
     print("Extracting downloads...")
-    downloads = list(folder.glob('**/*.zip'))
-    count = 0
-    total = len(downloads)
-    for file in downloads:
-        count += 1
-        print(f" ({str(count).rjust(len(str(total)))}/{total}) Extracting {file.name}")
-        with zipfile.ZipFile(file, 'r') as zip_obj:
-            # zip_obj.extractall(file.parent / 'abgaben')
-            safe_extract_zip(zip_obj, file.parent / 'abgaben')
+    downloads = index.files('zip')
+    failed = extract_archives(downloads, [file.parent / 'abgaben' for file in downloads], workers,
+                              processes)
+    for group in dict.fromkeys(file.parent / 'abgaben' for file in downloads):
+        if group.is_dir():
+            index.scan(group)
     print("Extracting archives...")
-    archives = list(folder.glob("**/abgaben/**/*.zip"))
-    count = 0
-    total = len(archives)
-    for file in archives:
-        count += 1
-        print(f" ({str(count).rjust(len(str(total)))}/{total}) Extracting {file.name}")
-        with zipfile.ZipFile(file, 'r') as zip_obj:
-            # zip_obj.extractall(file.parent)
-            safe_extract_zip(zip_obj, file.parent)
-    target_folders = [f for f in itertools.chain.from_iterable(
-        (group.iterdir() for group in folder.glob('**/abgaben')))
-                      if f.is_dir()]
+    groups = index.dirs('abgaben')
+    archives = list(dict.fromkeys(itertools.chain.from_iterable(
+        index.files('zip', group) for group in groups)))
+    failed += extract_archives(archives, [file.parent for file in archives], workers, processes)
+    for group in groups:
+        index.scan(group)
+    target_folders = index.handins()
     if check_style:
         print("Running style check...")
-        lint_files(target_folders, author_pairs, deduction, docstring_deduction)
+        lint_files(target_folders, index, author_pairs, deduction, docstring_deduction)
     else:
         print("(Style check skipped.)")
     print("Copying ratings table...")
@@ -302,38 +353,50 @@ def begin_grading(folder: pathlib.Path, ratings_file: pathlib.Path, check_style:
         count += 1
         target_name = "Bewertung " + sheet + " " + f.name.split('_')[0] + ratings_file.suffix
         shutil.copy(ratings_file, f / target_name)
-        if len(violations_checkers) != 0:
+        if len(deduction_summaries) != 0:
             student_name = f.name.split('_')[0]
             file_path = os.path.join(f, target_name)
-            if student_name in violations_checkers:
-                update_style_deduction(file_path, violations_checkers[student_name], student_name)
+            if student_name in deduction_summaries:
+                update_style_deduction(file_path, deduction_summaries.pop(student_name),
+                                       student_name)
         print(f'({count}/{len(target_folders)}) Copy in {f.name}')
+    if failed:
+        print(f"Issues occurred ({len(failed)}), these archives could not be extracted:")
+        for file in failed:
+            print(f" ! {file}")
     print("Done!")
 
 
 def finalise_grading(folder: pathlib.Path):
     issues = 0
     print("Copying grades...")
-    folders = list(folder.glob("**/abgaben"))
+    index = FileIndex(folder)
+    folders = index.dirs('abgaben')
+    targets = []
     for f in folders:
         overall_rating_path = ''
-        for file_name in os.listdir(f.parent):
-            if file_name.startswith('Bewertungen-'):
-                overall_rating_path = os.path.join(f.parent, file_name)
+        for entry in index.children(f.parent):
+            if entry.path.name.startswith('Bewertungen-'):
+                overall_rating_path = str(entry.path)
                 break
         target = f.parent / 'korrekturen'
         target.mkdir()
+        targets.append(target)
         count = 0
-        handins = [x for x in f.iterdir() if x.name != '.DS_Store']
+        handins = [x.path for x in index.children(f) if x.path.name != '.DS_Store']
         for handin in handins:
             count += 1
             this_target = target / handin.name
             this_target.mkdir()
+            files = [x.path for x in index.children(handin) if x.kind != 'dir']
+            # Names are compared like the globs did, i.e. case-insensitive on Windows
+            names = [os.path.normcase(x.name) for x in files]
             # copy the stylecheck datas
-            if (handin / 'stylecheck.txt').exists():
+            if os.path.normcase('stylecheck.txt') in names:
                 shutil.copy(handin / 'stylecheck.txt', this_target)
             # copy the grading datas
-            glob = list(handin.glob('Bewertung *'))
+            glob = [x for x, name in zip(files, names)
+                    if name.startswith(os.path.normcase('Bewertung '))]
             if len(glob) == 1:
                 print(f'({count}/{len(handins)}) Copying from {handin.name}')
                 shutil.copy(glob[0], this_target)
@@ -351,10 +414,9 @@ def finalise_grading(folder: pathlib.Path):
         print(f"Issues occurred ({issues}), not building final upload file(s).")
         return
     print("Building upload files...")
-    folders = list(folder.glob("**/korrekturen"))
     count = 0
-    total = len(folders)
-    for f in folders:
+    total = len(targets)
+    for f in targets:
         count += 1
         print(f" ({str(count).rjust(len(str(total)))}/{total}) Building {f.parent.name}")
         with zipfile.ZipFile(f.parent / (f.parent.name + ".zip"), 'w') as outfile:
@@ -379,7 +441,7 @@ def get_points(file_path: str):
     return max(0, total_points)
 
 
-def update_style_deduction(file_path: str, violation_checker: ViolationChecker, student_name: str):
+def update_style_deduction(file_path: str, violation_checker: DeductionSummary, student_name: str):
     """
     Function to update the deduction for style violations in the given rating table
     author: Lukas Horst
@@ -456,6 +518,14 @@ def update_rating(overall_rating_path: str, student_rating_path: str, student_na
             return
 
 
+def positive_int(value: str) -> int:
+    """Argument type for numbers which have to be at least 1"""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, not {number}")
+    return number
+
+
 def main():
     """The function main is where execution begins."""
     print('EPRgrader v3/221031 running on ', datetime.now(), ' [', platform.platform(terse=True),
@@ -480,6 +550,12 @@ def main():
     begin_parser.add_argument('--docstringDeduction', action=argparse.BooleanOptionalAction,
                               default=True,
                               help='whether or not to give deduction on docstrings')
+    begin_parser.add_argument('--jobs', type=positive_int, default=os.cpu_count(),
+                              help='number of archives to extract in parallel '
+                                   '(default: the number of CPUs)')
+    begin_parser.add_argument('--processes', action=argparse.BooleanOptionalAction,
+                              default=False,
+                              help='whether to extract in processes instead of threads')
     lint_parser = subparsers.add_parser('relint', help='re-run pylint')
     lint_parser.add_argument('--pairs', action=argparse.BooleanOptionalAction, default=False,
                              help='whether or not to validate __author__ variables for pairs')
@@ -492,11 +568,11 @@ def main():
     args = parser.parse_args()
     if args.verb == 'begin':
         begin_grading(pathlib.Path(args.folder), pathlib.Path(args.table), args.stylecheck,
-                      args.pairs, args.deduction, args.docstringDeduction)
+                      args.pairs, args.deduction, args.docstringDeduction, args.jobs,
+                      args.processes)
     elif args.verb == 'relint':
-        lint_files([f for f in itertools.chain.from_iterable(
-            (group.iterdir() for group in pathlib.Path(args.folder).glob('**/abgaben'))) if
-                    f.is_dir()], args.pairs, args.deduction, args.docstringDeduction)
+        index = FileIndex(pathlib.Path(args.folder))
+        lint_files(index.handins(), index, args.pairs, args.deduction, args.docstringDeduction)
     elif args.verb == 'finalise':
         finalise_grading(pathlib.Path(args.folder))
 
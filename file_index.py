@@ -0,0 +1,105 @@
+"""
+Index of all files and directories of a sheet, built by a single walk of the file system.
+
+Used by eprgrader.py for all grading phases and by eprcheck_2019.py for the standalone check of
+the author variables.
+"""
+
+__author__ = "Lukas Horst"
+
+import collections
+import os
+import pathlib
+
+# Directories which are never descended into
+EXCLUDED_DIRS = frozenset(('__MACOSX', '.venv', '.git', '__pycache__'))
+# Directories of a virtualenv (recognised by its pyvenv.cfg) which are never descended into
+VENV_DIRS = frozenset(('bin', 'include', 'lib', 'lib64', 'scripts'))
+
+IndexEntry = collections.namedtuple('IndexEntry', ('path', 'size', 'mtime', 'kind'))
+
+
+class FileIndex:
+    """
+    Index of all files and directories of a sheet, built by a single walk which prunes the excluded
+    directories before descending into them
+    """
+
+    def __init__(self, root: pathlib.Path):
+        self.root = root
+        # {directory: [IndexEntry of each child]}
+        self._children = {}
+        self.scan(root)
+
+    def scan(self, folder: pathlib.Path):
+        """(Re)index the given folder and everything within it, e.g. after extracting into it"""
+        prefix = os.path.join(folder, '')
+        for key in [k for k in self._children if k == str(folder) or k.startswith(prefix)]:
+            del self._children[key]
+        if folder != self.root:
+            siblings = self._children.setdefault(str(folder.parent), [])
+            siblings[:] = [e for e in siblings if e.path != folder]
+            stat = folder.stat()
+            siblings.append(IndexEntry(folder, stat.st_size, stat.st_mtime, 'dir'))
+        stack = [folder]
+        while stack:
+            current = stack.pop()
+            try:
+                with os.scandir(current) as it:
+                    dir_entries = list(it)
+            except PermissionError:
+                # Unreadable directories are skipped, like the globs did
+                continue
+            # A bundled virtualenv may also be the project folder of a handin, so only the
+            # installed packages and scripts are skipped, not the folder itself
+            is_venv = any(e.name == 'pyvenv.cfg' for e in dir_entries)
+            children = []
+            for dir_entry in dir_entries:
+                is_dir = dir_entry.is_dir(follow_symlinks=False)
+                if is_dir and (dir_entry.name in EXCLUDED_DIRS
+                               or is_venv and dir_entry.name.lower() in VENV_DIRS):
+                    continue
+                # Matches case-insensitively on Windows, like the globs did
+                name = os.path.normcase(dir_entry.name)
+                path = current / dir_entry.name
+                stat = dir_entry.stat(follow_symlinks=False)
+                if is_dir:
+                    kind = 'dir'
+                    stack.append(path)
+                elif name.endswith('.py'):
+                    kind = 'py'
+                elif name.endswith('.zip'):
+                    kind = 'zip'
+                else:
+                    kind = 'file'
+                children.append(IndexEntry(path, stat.st_size, stat.st_mtime, kind))
+            self._children[str(current)] = children
+
+    def children(self, folder: pathlib.Path):
+        """Return the entries directly within the given folder"""
+        return self._children.get(str(folder), [])
+
+    def walk(self, folder: pathlib.Path = None):
+        """Yield all entries anywhere within the given folder (default: the whole sheet)"""
+        stack = [self.root if folder is None else folder]
+        while stack:
+            for entry in self.children(stack.pop()):
+                yield entry
+                if entry.kind == 'dir':
+                    stack.append(entry.path)
+
+    def files(self, kind: str, folder: pathlib.Path = None):
+        """Return the paths of all files of the given kind anywhere within the given folder"""
+        return [entry.path for entry in self.walk(folder) if entry.kind == kind]
+
+    def dirs(self, name: str, folder: pathlib.Path = None):
+        """Return the paths of all directories with the given name anywhere within the folder
+        (case-insensitive on Windows, like the globs)"""
+        name = os.path.normcase(name)
+        return [entry.path for entry in self.walk(folder)
+                if entry.kind == 'dir' and os.path.normcase(entry.path.name) == name]
+
+    def handins(self):
+        """Return the paths of all handin folders, i.e. the directories within `abgaben'"""
+        return [entry.path for group in self.dirs('abgaben') for entry in self.children(group)
+                if entry.kind == 'dir']
@@ -1,7 +1,5 @@
 __author__ = 'Lukas Horst'
 
-import re
-
 
 class ViolationChecker:
     __violation_groups = [
@@ -18,14 +16,12 @@ class ViolationChecker:
     ]
     # {violation_name: [amount of the violation, description, violation_group]}
     __violations = None
-    _style_check = ''
     __deduction = None
     __docstring_deduction = None
     __module_and_class_docstrings = None
 
-    def __init__(self, style_check: str, no_deduction: bool, docstring_deduction: bool):
+    def __init__(self, no_deduction: bool, docstring_deduction: bool):
         self.__module_and_class_docstrings = 0
-        self._style_check = style_check
         self.__deduction = no_deduction
         self.__docstring_deduction = docstring_deduction
         self.__violations = {'W0104': [0, 'Pointless statement', 0],
@@ -85,13 +81,13 @@ class ViolationChecker:
                              'E714': [0, 'Negative identity test should use \'is not\'', 0],
                              'E721': [0, 'Use \'isinstance\' instead of comparing types', 0]}
 
-    def check_violations(self):
-        """Method to search for all violations"""
-        for violation_name, _ in self.__violations.items():
-            all_violations = re.findall(rf',*{violation_name}.*', self._style_check)
-            if violation_name == 'C0114' or violation_name == 'C0115':
-                self.__module_and_class_docstrings += len(all_violations)
-            self.__violations[violation_name][0] = len(all_violations)
+    def check_line(self, line: str):
+        """Method to count the violations of a single line of the style check"""
+        for violation_name, value in self.__violations.items():
+            if violation_name in line:
+                if violation_name == 'C0114' or violation_name == 'C0115':
+                    self.__module_and_class_docstrings += 1
+                value[0] += 1
 
     def list_violation(self):
         """Method to return a list with all violations and the amount of the violations sort by
@@ -160,3 +156,20 @@ class ViolationChecker:
                 return 0.25
             else:
                 return 0
+
+    def summary(self):
+        """Method to return a compact summary with the deduction of every group"""
+        return DeductionSummary(self.count_deduction(i)
+                                for i in range(len(self.__violation_groups)))
+
+
+class DeductionSummary:
+    """Deduction of every violation group, kept until the rating tables are updated"""
+    __slots__ = ('__deductions',)
+
+    def __init__(self, deductions):
+        self.__deductions = tuple(deductions)
+
+    def count_deduction(self, violation_group: int):
+        """Method to return the deduction of the given group"""
+        return self.__deductions[violation_group]